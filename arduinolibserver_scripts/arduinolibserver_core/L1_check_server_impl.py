@@ -12,9 +12,10 @@ or
 """
 
 import sys
-import re
 from pathlib import Path
 
+from _scanner import read_candidate_text, scan_server_impl
+
 
 def check_server_impl(file_path):
     """
@@ -42,62 +43,28 @@ def check_server_impl(file_path):
             result['error'] = f"Path is not a file: {file_path}"
             return result
         
+        # Skip files that cannot contain a match before any decoding
+        text = read_candidate_text(file_path)
+        if text is None:
+            return result
+        
         # Resolve to full absolute path
         full_file_path = file_path.resolve()
         
-        # Read the file content
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-        
-        # Pattern to match ServerImpl macro followed by class declaration
-        # ServerImpl can have any content in brackets (capture the content)
-        # Class can have optional 'final' keyword
-        # Class must inherit from IServer
-        server_impl_pattern = re.compile(r'ServerImpl\s*\(([^)]*)\)')
-        class_pattern = re.compile(r'class\s+(\w+)(?:\s+final)?\s*:\s*public\s+IServer')
-        
-        def extract_bracket_content(content):
-            """Extract content from brackets, removing quotes if present."""
-            if not content:
-                return ""
-            # Strip whitespace
-            content = content.strip()
-            # Remove quotes if present (handles both single and double quotes)
-            if (content.startswith('"') and content.endswith('"')) or \
-               (content.startswith("'") and content.endswith("'")):
-                content = content[1:-1]
-            return content
-        
-        # Check each line and the next line
-        for i, line in enumerate(lines):
-            # Check if current line has ServerImpl macro
-            server_impl_match = server_impl_pattern.search(line)
-            if server_impl_match:
-                # Extract the content inside brackets
-                bracket_content = server_impl_match.group(1)
-                extracted_content = extract_bracket_content(bracket_content)
-                
-                # Check next few lines for class declaration (allow some whitespace/comments)
-                # Look ahead up to 5 lines (to handle comments or blank lines)
-                for j in range(i + 1, min(i + 6, len(lines))):
-                    class_match = class_pattern.search(lines[j])
-                    if class_match:
-                        # Found a match!
-                        class_name = class_match.group(1)
-                        server_impl_full = server_impl_match.group(0)
-                        
-                        match_info = {
-                            'line_number': i + 1,  # 1-indexed
-                            'server_impl_line': line.strip(),
-                            'class_line': lines[j].strip(),
-                            'class_name': class_name,
-                            'server_impl_macro': server_impl_full,
-                            'server_impl_content': extracted_content,
-                            'file_path': str(full_file_path)  # Full absolute path
-                        }
-                        result['matches'].append(match_info)
-                        result['found'] = True
-                        break  # Found match for this ServerImpl, move to next
+        # A single regex pass finds each ServerImpl macro together with its class declaration
+        matches, _ = scan_server_impl(text)
+        for match in matches:
+            match_info = {
+                'line_number': match['line_number'],  # 1-indexed
+                'server_impl_line': match['line'].strip(),
+                'class_line': match['class_line'].strip(),
+                'class_name': match['class_name'],
+                'server_impl_macro': match['server_impl_macro'],
+                'server_impl_content': match['server_impl_content'],
+                'file_path': str(full_file_path)  # Full absolute path
+            }
+            result['matches'].append(match_info)
+            result['found'] = True
     
     except Exception as e:
         result['error'] = f"Error processing file: {str(e)}"
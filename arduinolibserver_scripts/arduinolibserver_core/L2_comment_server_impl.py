@@ -6,9 +6,10 @@ and comments them out using C++ style comments (//).
 """
 
 import sys
-import re
 from pathlib import Path
 
+from _scanner import read_candidate_text, scan_server_impl, write_changes
+
 
 def comment_server_impl(file_path, dry_run=False):
     """
@@ -37,52 +38,26 @@ def comment_server_impl(file_path, dry_run=False):
             result['error'] = f"Path is not a file: {file_path}"
             return result
         
-        # Read the file content
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-        
-        # Pattern to match ServerImpl macro
-        server_impl_pattern = re.compile(r'(\s*)(ServerImpl\s*\([^)]*\))')
-        class_pattern = re.compile(r'class\s+(\w+)(?:\s+final)?\s*:\s*public\s+IServer')
-        
-        modified_lines = lines.copy()
-        lines_to_comment = []
+        # Skip files that cannot contain a match before any decoding
+        text = read_candidate_text(file_path)
+        if text is None:
+            return result
         
-        # Check each line for ServerImpl macro
-        for i, line in enumerate(lines):
-            # Check if current line has ServerImpl macro
-            server_impl_match = server_impl_pattern.search(line)
-            if server_impl_match:
-                # Check if this ServerImpl is followed by a class that inherits from IServer
-                # Look ahead up to 5 lines (to handle comments or blank lines)
-                found_class = False
-                for j in range(i + 1, min(i + 6, len(lines))):
-                    class_match = class_pattern.search(lines[j])
-                    if class_match:
-                        found_class = True
-                        break
-                
-                # Only comment if it's followed by a matching class
-                if found_class:
-                    # Check if already commented
-                    stripped = line.lstrip()
-                    if not stripped.startswith('//'):
-                        # Preserve indentation and comment out
-                        indent = server_impl_match.group(1)
-                        macro = server_impl_match.group(2)
-                        commented_line = f"{indent}// {macro}\n"
-                        modified_lines[i] = commented_line
-                        lines_to_comment.append({
-                            'line_number': i + 1,
-                            'original': line.rstrip('\n'),
-                            'commented': commented_line.rstrip('\n')
-                        })
-                        result['modified'] = True
+        # Each match is a ServerImpl macro followed by a class that inherits from IServer
+        matches, changes = scan_server_impl(text)
+        lines_to_comment = [
+            {
+                'line_number': match['line_number'],
+                'original': match['line'],
+                'commented': match['commented_line']
+            }
+            for match in matches if match['commented_line'] is not None
+        ]
+        result['modified'] = bool(changes)
         
-        # Write the modified content if not dry run
-        if result['modified'] and not dry_run:
-            with open(file_path, 'w', encoding='utf-8', errors='ignore') as f:
-                f.writelines(modified_lines)
+        # Write the modified content only if something changed and not dry run
+        if changes and not dry_run:
+            write_changes(file_path, text, changes)
         
         result['commented_lines'] = lines_to_comment
         
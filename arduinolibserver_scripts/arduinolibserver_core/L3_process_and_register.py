@@ -10,30 +10,48 @@ For each file:
 Then generates RegisterServer calls and updates ServerFactoryInit.h
 """
 
+import os
 import sys
 import re
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+from _scanner import PATTERN_DIGEST, contains_server_impl, read_candidate_text, scan_server_impl, write_changes
 
-def extract_bracket_content(content):
-    """Extract content from brackets, removing quotes if present."""
-    if not content:
-        return ""
-    # Strip whitespace
-    content = content.strip()
-    # Remove quotes if present (handles both single and double quotes)
-    if (content.startswith('"') and content.endswith('"')) or \
-       (content.startswith("'") and content.endswith("'")):
-        content = content[1:-1]
-    return content
+# orjson is optional; fall back to the standard library parser
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# Cache of scan results (per library, or per project from the pre-build hook), keyed by file path
+# and validated by mtime and size
+CACHE_FILE_NAME = ".arduinolibserver_cache.json"
+
+# Stored in the cache file; a cache written by another format or scanner version is ignored.
+# Bump the leading number when the layout of cached entries changes.
+_CACHE_VERSION = f"1-{PATTERN_DIGEST}"
+
+# Below this many files a process pool costs more than it saves
+_MIN_PARALLEL_FILES = 4
 
+# Pattern to match the placeholder Init() function
+# Match: inline Bool Init() { ... return false; ... }
+_INIT_PLACEHOLDER_RE = re.compile(
+    rb'(inline\s+Bool\s+Init\s*\(\s*\)\s*\{)\s*return\s+false\s*;(\s*\})',
+    re.DOTALL
+)
 
-def check_and_comment_server_impl(file_path):
+
+def check_and_comment_server_impl(file_path, single_match=False):
     """
     Check if a file contains ServerImpl macro and comment it out.
     
     Args:
         file_path: Path to the file to process
+        single_match: If True, stop scanning after the first match (one server per header)
     
     Returns:
         dict: Dictionary with 'found' (bool), 'matches' (list), 'modified' (bool), and 'error' (str if any)
@@ -55,64 +73,31 @@ def check_and_comment_server_impl(file_path):
             result['error'] = f"Path is not a file: {file_path}"
             return result
         
-        # Read the file content
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-        
-        # Pattern to match ServerImpl macro
-        server_impl_pattern = re.compile(r'(\s*)(ServerImpl\s*\(([^)]*)\))')
-        class_pattern = re.compile(r'class\s+(\w+)(?:\s+final)?\s*:\s*public\s+IServer')
+        # Skip files that cannot contain a match before any decoding
+        text = read_candidate_text(file_path)
+        if text is None:
+            return result
         
-        modified_lines = lines.copy()
+        # Resolve to full absolute path once for all matches in this file
+        full_file_path = str(file_path.resolve())
         
-        # Check each line for ServerImpl macro
-        for i, line in enumerate(lines):
-            # Check if current line has ServerImpl macro
-            server_impl_match = server_impl_pattern.search(line)
-            if server_impl_match:
-                # Check if this ServerImpl is followed by a class that inherits from IServer
-                # Look ahead up to 5 lines (to handle comments or blank lines)
-                found_class = False
-                class_name = None
-                for j in range(i + 1, min(i + 6, len(lines))):
-                    class_match = class_pattern.search(lines[j])
-                    if class_match:
-                        found_class = True
-                        class_name = class_match.group(1)
-                        break
-                
-                # Only process if it's followed by a matching class
-                if found_class:
-                    # Extract the content inside brackets
-                    bracket_content = server_impl_match.group(3)
-                    extracted_content = extract_bracket_content(bracket_content)
-                    
-                    # Check if already commented
-                    stripped = line.lstrip()
-                    if not stripped.startswith('//'):
-                        # Preserve indentation and comment out
-                        indent = server_impl_match.group(1)
-                        macro = server_impl_match.group(2)
-                        commented_line = f"{indent}// {macro}\n"
-                        modified_lines[i] = commented_line
-                        result['modified'] = True
-                    
-                    # Store match information
-                    # Resolve to full absolute path
-                    full_file_path = file_path.resolve()
-                    match_info = {
-                        'line_number': i + 1,
-                        'class_name': class_name,
-                        'server_impl_content': extracted_content,
-                        'file_path': str(full_file_path)  # Full absolute path
-                    }
-                    result['matches'].append(match_info)
-                    result['found'] = True
+        # Each match is a ServerImpl macro followed by a class that inherits from IServer
+        matches, changes = scan_server_impl(text, single_match=single_match)
+        for match in matches:
+            # Store match information
+            match_info = {
+                'line_number': match['line_number'],
+                'class_name': match['class_name'],
+                'server_impl_content': match['server_impl_content'],
+                'file_path': full_file_path  # Full absolute path
+            }
+            result['matches'].append(match_info)
+            result['found'] = True
         
-        # Write the modified content if changes were made
-        if result['modified']:
-            with open(file_path, 'w', encoding='utf-8', errors='ignore') as f:
-                f.writelines(modified_lines)
+        # Write the modified content only if changes were made
+        if changes:
+            write_changes(file_path, text, changes)
+            result['modified'] = True
     
     except Exception as e:
         result['error'] = f"Error processing file: {str(e)}"
@@ -120,12 +105,152 @@ def check_and_comment_server_impl(file_path):
     return result
 
 
+def load_scan_cache(cache_dir):
+    """
+    Load cached scan results from a directory (the library directory, or a project's .pio directory).
+    
+    Args:
+        cache_dir: Path to the directory holding the cache file
+    
+    Returns:
+        dict: Mapping of file path to {'stat': [mtime_ns, size], 'matches': [...]}, empty if unavailable
+              or written by a different cache version
+    """
+    try:
+        with open(Path(cache_dir) / CACHE_FILE_NAME, 'rb') as f:
+            data = _json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != _CACHE_VERSION:
+        return {}
+    files = data.get('files')
+    return files if isinstance(files, dict) else {}
+
+
+def save_scan_cache(cache_dir, cache):
+    """
+    Save scan results to a directory, ignoring failures (e.g. read-only installs).
+    
+    Args:
+        cache_dir: Path to the directory holding the cache file
+        cache: Cache dict as returned by load_scan_cache
+    """
+    try:
+        with open(Path(cache_dir) / CACHE_FILE_NAME, 'w', encoding='utf-8') as f:
+            json.dump({'version': _CACHE_VERSION, 'files': cache}, f)
+    except OSError:
+        pass
+
+
+def _is_valid_cache_entry(entry):
+    """Check that a cache entry has the shape written by process_files; anything else is a cache miss."""
+    if not isinstance(entry, dict):
+        return False
+    stat = entry.get('stat')
+    matches = entry.get('matches')
+    if not isinstance(stat, list) or len(stat) != 2 or not isinstance(matches, list):
+        return False
+    return all(isinstance(match, dict) and 'class_name' in match and 'server_impl_content' in match
+               for match in matches)
+
+
+def _may_contain_server_impl(file_path):
+    """Literal prefilter for process_files; files that cannot be opened count as candidates."""
+    try:
+        return contains_server_impl(file_path)
+    except OSError:
+        # Let check_and_comment_server_impl report the error
+        return True
+
+
+def process_files(file_paths, cache=None):
+    """
+    Run check_and_comment_server_impl on many files in parallel, reusing cached results.
+    
+    A file whose mtime and size match its cache entry is not read at all, and a file without
+    the ServerImpl literal is answered here without being sent to a worker process.
+    
+    Args:
+        file_paths: List of files to process
+        cache: Optional dict from load_scan_cache, keyed by absolute path; updated in place with fresh results
+    
+    Returns:
+        list: Result dicts in the same order as file_paths
+    """
+    results = [None] * len(file_paths)
+    pending = []
+    
+    for idx, file_path in enumerate(file_paths):
+        # Key by absolute path so relative paths from different working directories don't collide
+        entry = cache.get(os.path.abspath(file_path)) if cache is not None else None
+        if _is_valid_cache_entry(entry):
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                st = None
+            if st is not None and entry.get('stat') == [st.st_mtime_ns, st.st_size]:
+                # Unchanged since the last run, so its macros are already commented out
+                results[idx] = {
+                    'found': bool(entry['matches']),
+                    'matches': entry['matches'],
+                    'modified': False,
+                    'error': None
+                }
+                continue
+        pending.append(idx)
+    
+    # Cheap literal prefilter; most headers never mention ServerImpl.
+    # It is dominated by open/mmap calls, so threads overlap the file I/O.
+    pending_paths = [file_paths[idx] for idx in pending]
+    if len(pending) < _MIN_PARALLEL_FILES:
+        may_match = [_may_contain_server_impl(file_path) for file_path in pending_paths]
+    else:
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2)) as executor:
+            may_match = list(executor.map(_may_contain_server_impl, pending_paths))
+    
+    candidates = []
+    for idx, candidate in zip(pending, may_match):
+        if candidate:
+            candidates.append(idx)
+        else:
+            results[idx] = {'found': False, 'matches': [], 'modified': False, 'error': None}
+    
+    if candidates:
+        candidate_paths = [file_paths[idx] for idx in candidates]
+        if len(candidates) < _MIN_PARALLEL_FILES:
+            # Not worth the pool startup cost
+            fresh_results = [check_and_comment_server_impl(file_path) for file_path in candidate_paths]
+        else:
+            # Files are independent, so process them in parallel
+            with ProcessPoolExecutor() as executor:
+                fresh_results = list(executor.map(check_and_comment_server_impl, candidate_paths, chunksize=16))
+        
+        for idx, result in zip(candidates, fresh_results):
+            results[idx] = result
+    
+    if cache is not None:
+        for idx in pending:
+            if not results[idx]['error']:
+                # Stat after processing so a file we just rewrote is cached as-is
+                try:
+                    st = os.stat(file_paths[idx])
+                except OSError:
+                    # Gone since it was processed; just leave it out of the cache
+                    continue
+                cache[os.path.abspath(file_paths[idx])] = {
+                    'stat': [st.st_mtime_ns, st.st_size],
+                    'matches': results[idx]['matches']
+                }
+    
+    return results
+
+
 def generate_include_statements(registrations, library_dir):
     """
     Generate #include statements for all class files using full absolute paths.
     
     Args:
-        registrations: List of dicts with 'file_path'
+        registrations: List of dicts with 'file_path' (already resolved by check_and_comment_server_impl)
         library_dir: Path to the library directory (not used, kept for compatibility)
     
     Returns:
@@ -134,22 +259,11 @@ def generate_include_statements(registrations, library_dir):
     if not registrations:
         return ""
     
-    includes = []
-    seen_paths = set()
-    
-    for reg in registrations:
-        file_path = Path(reg['file_path']).resolve()
-        
-        # Skip if we've already included this file
-        if str(file_path) in seen_paths:
-            continue
-        seen_paths.add(str(file_path))
-        
-        # Use full absolute path
-        include_path = f'"{file_path}"'
-        includes.append(f'#include {include_path}')
+    # Deduplicate while keeping the order in which files were first seen
+    include_paths = dict.fromkeys(reg['file_path'] for reg in registrations)
     
-    return '\n'.join(includes)
+    # Use full absolute paths
+    return '\n'.join(f'#include "{file_path}"' for file_path in include_paths)
 
 
 def generate_registration_code(registrations):
@@ -177,6 +291,59 @@ def generate_registration_code(registrations):
     return '\n'.join(lines)
 
 
+def _find_include_insert_index(lines, init_start):
+    """
+    Find the line index where generated #include statements go, ahead of the Init() function.
+    
+    Includes go after the last #include line, or else after the last /** */ comment block,
+    skipping blank lines. Without either, they go right before the Init() function.
+    
+    Args:
+        lines: Lines of ServerFactoryInit.h as bytes (with line endings)
+        init_start: Byte offset of the Init() function
+    
+    Returns:
+        int: Index into lines to insert at
+    """
+    # Locate the line holding the Init() function
+    init_idx = len(lines)
+    offset = 0
+    for idx, line in enumerate(lines):
+        offset += len(line)
+        if offset > init_start:
+            init_idx = idx
+            break
+    
+    # Look backwards for the last #include or /** comment
+    last_include_idx = None
+    last_comment_idx = None
+    for idx in range(init_idx - 1, -1, -1):
+        line = lines[idx]
+        if b'#include' in line:
+            last_include_idx = idx
+            break
+        if last_comment_idx is None and b'/**' in line:
+            last_comment_idx = idx
+    
+    if last_include_idx is not None:
+        # Insert after the last #include line
+        insert_idx = last_include_idx + 1
+    elif last_comment_idx is not None:
+        # Insert after the line closing the comment block
+        insert_idx = last_comment_idx
+        while insert_idx < init_idx and b'*/' not in lines[insert_idx]:
+            insert_idx += 1
+        insert_idx += 1
+    else:
+        # Insert right before Init() function
+        return init_idx
+    
+    # Skip any blank lines
+    while insert_idx < init_idx and not lines[insert_idx].strip():
+        insert_idx += 1
+    return insert_idx
+
+
 def update_server_factory_init(library_dir, registration_code, include_statements):
     """
     Update ServerFactoryInit.h with the generated include statements and registration code.
@@ -202,61 +369,34 @@ def update_server_factory_init(library_dir, registration_code, include_statement
             result['error'] = f"ServerFactoryInit.h not found at {init_file}"
             return result
         
-        # Read the file
-        with open(init_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # Pattern to match the placeholder Init() function
-        # Match: inline Bool Init() { ... return false; ... }
-        pattern = re.compile(
-            r'(inline\s+Bool\s+Init\s*\(\s*\)\s*\{)\s*return\s+false\s*;(\s*\})',
-            re.MULTILINE | re.DOTALL
-        )
+        # Read the file as bytes; the header is ASCII C++ so no decoding is needed
+        content = init_file.read_bytes()
+        # Match the file's line endings so CRLF headers don't end up mixed
+        newline = b'\r\n' if b'\r\n' in content else b'\n'
         
         # Replace the placeholder with includes + registration code
         # First, add includes before the Init() function
         if include_statements:
             # Find the position of the Init() function
-            init_match = pattern.search(content)
+            init_match = _INIT_PLACEHOLDER_RE.search(content)
             if init_match:
-                # Find the line before Init() function (usually a comment or blank line)
-                init_start = init_match.start()
-                # Look backwards to find where to insert includes (after last #include or after comment block)
-                # Find the last #include or /** comment
-                last_include_pos = content.rfind('#include', 0, init_start)
-                last_comment_pos = content.rfind('/**', 0, init_start)
-                
-                # Insert after the last #include or after the comment block
-                if last_include_pos != -1:
-                    # Find the end of the last #include line
-                    insert_pos = content.find('\n', last_include_pos) + 1
-                    # Skip any blank lines
-                    while insert_pos < init_start and content[insert_pos:insert_pos+1].strip() == '':
-                        insert_pos += 1
-                    content = content[:insert_pos] + include_statements + '\n\n' + content[insert_pos:]
-                elif last_comment_pos != -1:
-                    # Find the end of the comment block (look for */)
-                    comment_end = content.find('*/', last_comment_pos) + 2
-                    insert_pos = content.find('\n', comment_end) + 1
-                    # Skip any blank lines
-                    while insert_pos < init_start and content[insert_pos:insert_pos+1].strip() == '':
-                        insert_pos += 1
-                    content = content[:insert_pos] + include_statements + '\n\n' + content[insert_pos:]
-                else:
-                    # Insert right before Init() function
-                    content = content[:init_start] + include_statements + '\n\n' + content[init_start:]
+                lines = content.splitlines(keepends=True)
+                insert_idx = _find_include_insert_index(lines, init_match.start())
+                includes = include_statements.encode('utf-8').replace(b'\n', newline)
+                lines[insert_idx:insert_idx] = [includes + newline + newline]
+                content = b''.join(lines)
         
         # Now replace the Init() function body
-        replacement = r'\1\n' + registration_code + r'\2'
-        new_content = pattern.sub(replacement, content)
+        body = registration_code.encode('utf-8').replace(b'\n', newline)
+        new_content = _INIT_PLACEHOLDER_RE.sub(
+            lambda m: m.group(1) + newline + body + m.group(2), content)
         
         if new_content == content and not include_statements:
             result['error'] = "Could not find placeholder Init() function to replace"
             return result
         
         # Write the updated content
-        with open(init_file, 'w', encoding='utf-8', errors='ignore') as f:
-            f.write(new_content)
+        init_file.write_bytes(new_content)
         
         result['success'] = True
     
@@ -273,7 +413,8 @@ def main():
         print("Example: python L3_process_and_register.py /path/to/lib /path/to/file1.h /path/to/file2.h")
         sys.exit(1)
     
-    library_dir = sys.argv[1]
+    # Resolve once and share with both the include generation and the ServerFactoryInit.h update
+    library_dir = Path(sys.argv[1]).resolve()
     file_paths = sys.argv[2:]
     
     print(f"Processing {len(file_paths)} file(s)...")
@@ -283,10 +424,13 @@ def main():
     processed_count = 0
     commented_count = 0
     
-    # Process each file
-    for file_path in file_paths:
+    # Process all files (reusing results for unchanged files) and report in input order
+    cache = load_scan_cache(library_dir)
+    results = process_files(file_paths, cache)
+    save_scan_cache(library_dir, cache)
+    
+    for file_path, result in zip(file_paths, results):
         print(f"Processing: {file_path}")
-        result = check_and_comment_server_impl(file_path)
         
         if result['error']:
             print(f"  Error: {result['error']}")
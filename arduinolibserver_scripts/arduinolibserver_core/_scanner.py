@@ -0,0 +1,227 @@
+"""
+Shared ServerImpl scanning used by the L1, L2 and L3 scripts.
+
+Finds ServerImpl macros above classes that inherit from IServer, works out
+how to comment them out, and writes the commented file back.
+"""
+
+import os
+import re
+import mmap
+import hashlib
+import shutil
+import tempfile
+
+
+# ServerImpl(...) macro followed within the next 5 lines by a class that inherits from IServer.
+# Groups: 1 indentation, 2 full macro, 3 bracket content, 4 class declaration, 5 class name.
+# The class is matched inside a lookahead so it is not consumed by the match.
+_SERVER_IMPL_CLASS_RE = re.compile(r'''
+    ([^\S\n]*)(ServerImpl[^\S\n]*\(([^)\n]*)\))
+    (?=(?:[^\n]*\n){1,5}?[^\n]*?
+       (class[^\S\n]+(\w+)(?:[^\S\n]+final)?[^\S\n]*:[^\S\n]*public[^\S\n]+IServer))
+''', re.VERBOSE)
+
+# Files smaller than this are read directly; mapping them costs more than it saves
+_MMAP_MIN_SIZE = 4096
+
+# Byte-level version of the pattern above, searched directly on the mapped file so headers that
+# mention ServerImpl without an IServer class are never decoded. Any line ending counts as a
+# newline, matching the text-mode translation done by read_candidate_text.
+_SERVER_IMPL_CLASS_BYTES_RE = re.compile(rb'''
+    ServerImpl[^\S\r\n]*\([^)\r\n]*\)
+    (?=(?:[^\r\n]*(?:\r\n|\r|\n)){1,5}?[^\r\n]*?
+       class[^\S\r\n]+[^\s:]+(?:[^\S\r\n]+final)?[^\S\r\n]*:[^\S\r\n]*public[^\S\r\n]+IServer)
+''', re.VERBOSE)
+
+# Changes whenever the matching patterns change, so persisted scan results can be invalidated
+PATTERN_DIGEST = hashlib.sha1(_SERVER_IMPL_CLASS_RE.pattern.encode('utf-8')
+                              + _SERVER_IMPL_CLASS_BYTES_RE.pattern).hexdigest()[:16]
+
+
+def extract_bracket_content(content):
+    """Extract content from brackets, removing quotes if present."""
+    if not content:
+        return ""
+    content = content.strip()
+    # Remove matching quotes if present (handles both single and double quotes)
+    if content[:1] in ('"', "'") and content[-1:] == content[:1]:
+        return content[1:-1]
+    return content
+
+
+def _raw_bytes_match(buf, full_pattern):
+    """Run the literal check (and optionally the byte-level pattern) on a bytes-like buffer."""
+    pos = buf.find(b'ServerImpl')
+    if pos < 0:
+        return False
+    return not full_pattern or _SERVER_IMPL_CLASS_BYTES_RE.search(buf, pos) is not None
+
+
+def _read_if_match(file_path, full_pattern):
+    """
+    Return a file's raw bytes only if they pass the ServerImpl prefilter.
+    
+    Small files are read directly; files of _MMAP_MIN_SIZE bytes or more are memory-mapped so
+    only the pages the search touches are paged in, and nothing is copied unless it matches.
+    
+    Args:
+        file_path: Path of the file to check
+        full_pattern: If True, also require the byte-level ServerImpl/IServer pattern
+    
+    Returns:
+        bytes: The raw file content, or None if the file cannot match
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_MIN_SIZE:
+            data = f.read()
+            return data if _raw_bytes_match(data, full_pattern) else None
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:] if _raw_bytes_match(mm, full_pattern) else None
+        except ValueError:
+            # Empty files cannot be mapped (and cannot contain a match)
+            return None
+
+
+def contains_server_impl(file_path):
+    """
+    Check a file's raw bytes for the ServerImpl literal without decoding it.
+    
+    Raises OSError if the file cannot be opened.
+    
+    Returns:
+        bool: False if the file cannot contain a ServerImpl macro
+    """
+    return _read_if_match(file_path, full_pattern=False) is not None
+
+
+def read_candidate_text(file_path):
+    """
+    Read a file's text only if its raw bytes contain a ServerImpl macro above an IServer class.
+    
+    The raw bytes are checked with a literal find and then the byte-level pattern,
+    so files without a match are never decoded.
+    
+    Returns:
+        str: Decoded text with newlines translated as in text mode, or None if the file cannot match
+    """
+    data = _read_if_match(file_path, full_pattern=True)
+    if data is None:
+        return None
+    return data.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _line_bounds(text, pos):
+    """Return the (start, end) offsets of the line containing pos, excluding the newline."""
+    start = text.rfind('\n', 0, pos) + 1
+    end = text.find('\n', pos)
+    if end < 0:
+        end = len(text)
+    return start, end
+
+
+def scan_server_impl(text, single_match=False):
+    """
+    Find ServerImpl macros above IServer classes and work out how to comment them out.
+    
+    Only the first ServerImpl macro on a line is considered.
+    
+    Args:
+        text: File content as returned by read_candidate_text
+        single_match: If True, stop after the first match (one server per header)
+    
+    Returns:
+        tuple: (matches, changes) where matches is a list of dicts with 'line_number', 'line',
+               'class_line', 'class_name', 'server_impl_macro', 'server_impl_content' and
+               'commented_line' (None if the macro is already commented out), and changes is
+               a list of (start, end, replacement) tuples for write_changes
+    """
+    matches = []
+    changes = []
+    line_number = 1
+    counted_to = 0
+    last_line_start = -1
+    for match in _SERVER_IMPL_CLASS_RE.finditer(text):
+        line_start, line_end = _line_bounds(text, match.start())
+        if line_start == last_line_start:
+            continue
+        last_line_start = line_start
+        line_number += text.count('\n', counted_to, line_start)
+        counted_to = line_start
+        
+        line = text[line_start:line_end]
+        class_line_start, class_line_end = _line_bounds(text, match.start(4))
+        
+        # Preserve indentation and comment out, unless already commented
+        commented_line = None
+        if not line.lstrip().startswith('//'):
+            commented_line = f"{match.group(1)}// {match.group(2)}"
+            changes.append((line_start, line_end, commented_line))
+        
+        matches.append({
+            'line_number': line_number,  # 1-indexed
+            'line': line,
+            'class_line': text[class_line_start:class_line_end],
+            'class_name': match.group(5),
+            'server_impl_macro': match.group(2),
+            'server_impl_content': extract_bracket_content(match.group(3)),
+            'commented_line': commented_line
+        })
+        if single_match:
+            break
+    
+    return matches, changes
+
+
+def write_changes(file_path, text, changes):
+    """
+    Write the text with line replacements applied to a sibling temp file and swap it in.
+    
+    Symlinks are followed, so the link stays and its target is rewritten. Hard-linked files and
+    files in directories where no temp file can be created are overwritten in place instead.
+    
+    Args:
+        file_path: Path of the file to replace
+        text: Original text of the file
+        changes: List of (start, end, replacement) tuples in ascending order
+    """
+    pieces = []
+    written_to = 0
+    for start, end, replacement in changes:
+        pieces.append(text[written_to:start])
+        pieces.append(replacement)
+        written_to = end
+    pieces.append(text[written_to:])
+    
+    content = ''.join(pieces)
+    # Replace the real file, so a symlinked header keeps its link and the target gets the change
+    target = os.path.realpath(file_path)
+    
+    # Hard-linked files must be rewritten in place, or the other links would keep the old content
+    if os.stat(target).st_nlink > 1:
+        _write_in_place(target, content)
+        return
+    
+    # A single write to a temp file, then an atomic rename over the original
+    try:
+        tmp_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', errors='ignore',
+                                               dir=os.path.dirname(target), delete=False)
+    except OSError:
+        # No temp file allowed next to it (e.g. read-only directory); the file itself may still be writable
+        _write_in_place(target, content)
+        return
+    try:
+        with tmp_file:
+            tmp_file.write(content)
+        shutil.copymode(target, tmp_file.name)
+        os.replace(tmp_file.name, target)
+    finally:
+        if os.path.exists(tmp_file.name):
+            os.unlink(tmp_file.name)
+
+
+def _write_in_place(file_path, content):
+    """Overwrite a file in place, keeping its inode (hard links) and working in read-only directories."""
+    with open(file_path, 'w', encoding='utf-8', errors='ignore') as f:
+        f.write(content)
@@ -55,6 +55,10 @@ def find_all_libraries(project_dir):
     return libraries
 
 
+# Directories that never hold library sources; whole subtrees are skipped while walking
+_SKIP_DIRS = {'.git', 'build', 'CMakeFiles', '.pio'}
+
+
 def get_all_files(library_dir):
     """
     Get all files in a library directory recursively.
@@ -63,18 +67,27 @@ def get_all_files(library_dir):
         library_dir: Path to the library directory
     
     Returns:
-        list: List of Path objects for all files
+        list: List of path strings for all files
     """
     files = []
-    if not library_dir.exists() or not library_dir.is_dir():
+    library_dir = os.fspath(library_dir)
+    if not os.path.isdir(library_dir):
         return files
     
-    try:
-        for item in library_dir.rglob("*"):
-            if item.is_file():
-                files.append(item)
-    except Exception as e:
-        print(f"  Warning: Error scanning {library_dir}: {e}")
+    # Depth-first walk; DirEntry type checks reuse the data from the directory read
+    pending = [library_dir]
+    while pending:
+        current_dir = pending.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in _SKIP_DIRS:
+                            pending.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path)
+        except OSError as e:
+            print(f"  Warning: Error scanning {current_dir}: {e}")
     
     return files
 
@@ -119,11 +132,7 @@ def execute_scripts(project_dir, library_dir):
             print(f"\nFound {len(files)} files:")
             for file_path in sorted(files):
                 # Print relative path from library root
-                try:
-                    rel_path = file_path.relative_to(lib_dir)
-                    print(f"  {rel_path}")
-                except ValueError:
-                    print(f"  {file_path}")
+                print(f"  {os.path.relpath(file_path, lib_dir)}")
         else:
             print("\nNo files found in this library.")
     
@@ -8,18 +8,30 @@ try:
 except NameError:
     # Not running in PlatformIO environment (e.g., running from CMake)
     print("Note: Not running in PlatformIO environment - some features may be limited")
-    # Create a mock env object for CMake builds
-    class MockEnv:
-        def get(self, key, default=None):
-            return default
-    env = MockEnv()
+    # An empty dict stands in for env in CMake builds (env.get() returns the default)
+    env = {}
 
 import sys
 import os
-import json
+import functools
 from pathlib import Path
 
 
+# Only header files are collected from libraries
+ALLOWED_EXTENSIONS = frozenset({'.h', '.hpp'})
+# Lower- and upper-case forms for a single str.endswith check per file name
+_SUFFIXES = tuple(ext for e in sorted(ALLOWED_EXTENSIONS) for ext in (e, e.upper()))
+
+# Directories that are never descended into while scanning libraries (dot-directories are skipped too).
+# Names listed in ARDUINO_LIB_SCAN_DIRS (comma-separated, e.g. "examples,test") are scanned anyway.
+_SCAN_DIRS = {name.strip() for name in os.environ.get("ARDUINO_LIB_SCAN_DIRS", "").split(",")}
+PRUNE_DIRS = frozenset({'.git', '.svn', '.hg', 'CMakeFiles', 'node_modules', '__pycache__', '.cache', 'build',
+                        'test', 'tests', 'examples'} - _SCAN_DIRS)
+
+# List every file in the library report only when ARDUINO_LIB_VERBOSE is set (e.g. ARDUINO_LIB_VERBOSE=1)
+VERBOSE = os.environ.get("ARDUINO_LIB_VERBOSE", "").lower() not in ("", "0", "false", "no")
+
+
 def get_project_dir():
     """
     Get the project directory from PlatformIO environment or CMake environment.
@@ -47,7 +59,83 @@ def get_project_dir():
     return project_dir
 
 
-def get_current_library_path(project_dir=None):
+@functools.lru_cache(maxsize=256)
+def _load_library_json(lib_json_path):
+    """
+    Read and parse a library.json file with a single open, once per path.
+    
+    Raises FileNotFoundError if the file does not exist (errors are not cached).
+    The cached dict is shared between callers and must not be modified.
+    
+    Args:
+        lib_json_path: Path string of the library.json file
+    
+    Returns:
+        dict: Parsed library.json contents
+    """
+    with open(lib_json_path, 'rb') as f:
+        data = f.read()
+    # Imported on first use; orjson is optional, fall back to the standard library parser
+    try:
+        from orjson import loads
+    except ImportError:
+        from json import loads
+    return loads(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _build_lib_index(libraries):
+    """
+    Index library directories by lower-cased directory name.
+    
+    Args:
+        libraries: Tuple of library directory paths from find_all_libraries
+    
+    Returns:
+        dict: Maps each lower-cased library name to a list of library directories with that name
+    """
+    lib_index = {}
+    for lib_dir in libraries:
+        lib_index.setdefault(lib_dir.name.lower(), []).append(lib_dir)
+    return lib_index
+
+
+def _find_library_from_script():
+    """
+    Find the current library from the location of this script (when __file__ is available).
+    
+    Returns:
+        Path: Path object pointing to the arduionolibserver library directory, or None if not found
+    """
+    # Use globals().get() to safely check for __file__ without raising NameError
+    script_file = globals().get('__file__', None)
+    if script_file:
+        try:
+            # Plain string paths; only the result is turned into a Path
+            script_path = os.path.realpath(script_file)
+            library_dir = os.path.dirname(os.path.dirname(script_path))
+            
+            # Check if this looks like the right library (has include/ and library.json)
+            if os.path.isdir(os.path.join(library_dir, "include")):
+                # Verify it's arduionolibserver by checking library.json (a missing file fails the open)
+                try:
+                    lib_data = _load_library_json(os.path.join(library_dir, "library.json"))
+                    if lib_data.get("name") == "arduionolibserver":
+                        return Path(library_dir)
+                except Exception:
+                    pass
+        except Exception:
+            # Any error accessing __file__ - skip this method
+            pass
+    return None
+
+
+# The script location never changes, so the library it lives in is looked up once
+_CURRENT_LIB_PATH = _find_library_from_script()
+
+
+@functools.lru_cache(maxsize=None)
+def get_current_library_path(project_dir=None, libraries=None):
     """
     Get the full path of the current library (arduionolibserver).
     
@@ -58,6 +146,7 @@ def get_current_library_path(project_dir=None):
     
     Args:
         project_dir: Optional project directory to search in libraries list
+        libraries: Optional tuple from find_all_libraries(project_dir), to avoid scanning again
     
     Returns:
         Path: Path object pointing to the arduionolibserver library directory, or None if not found
@@ -69,190 +158,276 @@ def get_current_library_path(project_dir=None):
         lib_path = env.get("LIB_PATH", None)
         if lib_path:
             lib_path = Path(lib_path)
-            if lib_path.exists() and (lib_path / "include").exists():
+            # include/ can only exist inside an existing library directory, so one stat covers both
+            if (lib_path / "include").exists():
                 return lib_path.resolve()
         
         # Also try PROJECT_LIBDEPS_DIR
         lib_dir = env.get("PROJECT_LIBDEPS_DIR", None)
         if lib_dir:
             # Look for arduionolibserver in libdeps
-            libdeps_path = Path(lib_dir)
-            if libdeps_path.exists():
-                for platform_dir in libdeps_path.iterdir():
-                    if platform_dir.is_dir():
-                        for lib_dir in platform_dir.iterdir():
-                            if lib_dir.is_dir() and "arduionolibserver" in lib_dir.name.lower():
-                                if (lib_dir / "include").exists() and (lib_dir / "library.json").exists():
-                                    try:
-                                        lib_json_path = lib_dir / "library.json"
-                                        with open(lib_json_path, 'r') as f:
-                                            lib_data = json.load(f)
-                                            if lib_data.get("name") == "arduionolibserver":
-                                                return lib_dir.resolve()
-                                    except Exception:
-                                        pass
-    
-    # Method 2: Find by script location (when __file__ is available)
-    # Use globals().get() to safely check for __file__ without raising NameError
-    script_file = globals().get('__file__', None)
-    if script_file:
-        try:
-            script_path = Path(script_file).resolve()
-            scripts_dir = script_path.parent
-            library_dir = scripts_dir.parent
-            
-            # Check if this looks like the right library (has include/ and library.json)
-            if library_dir.exists() and (library_dir / "include").exists() and (library_dir / "library.json").exists():
-                # Verify it's arduionolibserver by checking library.json
-                try:
-                    lib_json_path = library_dir / "library.json"
-                    if lib_json_path.exists():
-                        with open(lib_json_path, 'r') as f:
-                            lib_data = json.load(f)
-                            if lib_data.get("name") == "arduionolibserver":
-                                return library_dir.resolve()
-                except Exception:
-                    pass
-        except Exception:
-            # Any error accessing __file__ - skip this method
-            pass
-    
-    # Method 3: Search in project libraries if project_dir is provided
-    if project_dir:
-        libraries = find_all_libraries(project_dir)
-        for lib_dir in libraries:
-            lib_name = lib_dir.name
-            # Check for various naming patterns (arduionolibserver, arduionolibserver-src, etc.)
-            if "arduionolibserver" in lib_name.lower():
-                # Verify by checking for include/ directory and library.json
-                if (lib_dir / "include").exists() and (lib_dir / "library.json").exists():
+            for lib_dir in _iter_libdeps_libs(lib_dir, "arduionolibserver"):
+                if (lib_dir / "include").exists():
                     try:
-                        lib_json_path = lib_dir / "library.json"
-                        with open(lib_json_path, 'r') as f:
-                            lib_data = json.load(f)
-                            if lib_data.get("name") == "arduionolibserver":
-                                return lib_dir.resolve()
+                        lib_data = _load_library_json(str(lib_dir / "library.json"))
+                        if lib_data.get("name") == "arduionolibserver":
+                            return lib_dir.resolve()
                     except Exception:
-                        # If can't read library.json, still return if has include/
+                        pass
+    
+    # Method 2: Find by script location (resolved once at import)
+    if _CURRENT_LIB_PATH is not None:
+        return _CURRENT_LIB_PATH
+    
+    # Method 3: Search in project libraries (already found, or found from project_dir)
+    if project_dir or libraries is not None:
+        if libraries is None:
+            libraries = find_all_libraries(project_dir)
+        lib_index = _build_lib_index(libraries)
+        # Exact name first, then other naming patterns (arduionolibserver-src, etc.)
+        candidates = list(lib_index.get("arduionolibserver", ()))
+        for lib_name, lib_dirs in lib_index.items():
+            if lib_name != "arduionolibserver" and "arduionolibserver" in lib_name:
+                candidates.extend(lib_dirs)
+        for lib_dir in candidates:
+            # Verify by checking for include/ directory and library.json
+            if (lib_dir / "include").exists():
+                try:
+                    lib_data = _load_library_json(str(lib_dir / "library.json"))
+                    if lib_data.get("name") == "arduionolibserver":
                         return lib_dir.resolve()
+                except FileNotFoundError:
+                    # No library.json - not a match
+                    pass
+                except Exception:
+                    # If can't read library.json, still return if has include/
+                    return lib_dir.resolve()
     
     return None
 
 
+def _list_dir(path):
+    """
+    List a directory with a single os.scandir call.
+    
+    Returns:
+        list: DirEntry objects for the directory, or None if it is missing or not a directory
+    """
+    try:
+        with os.scandir(path) as entries:
+            return list(entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def _iter_libdeps_libs(libdeps_path, name_part):
+    """
+    Yield library directories under a PlatformIO libdeps directory (<libdeps>/<platform>/<library>).
+    
+    The cheap name check comes before any is_dir() call, and both levels are listed with os.scandir.
+    
+    Args:
+        libdeps_path: Path to the libdeps directory
+        name_part: Lower-case text the library directory name must contain
+    
+    Yields:
+        Path: Matching library directories
+    """
+    for platform_entry in _list_dir(libdeps_path) or []:
+        if not platform_entry.is_dir():
+            continue
+        for lib_entry in _list_dir(platform_entry.path) or []:
+            if name_part in lib_entry.name.lower() and lib_entry.is_dir():
+                yield Path(lib_entry.path)
+
+
+@functools.lru_cache(maxsize=None)
 def find_all_libraries(project_dir):
     """
     Find all library directories in the project (both PlatformIO and CMake).
     
+    Results are cached per project_dir and returned as an immutable tuple. A library reachable
+    from both build systems (same device and inode) is only returned once.
+    
     Args:
         project_dir: Path to the project root directory
     
     Returns:
-        list: List of Path objects pointing to library directories
+        tuple: Path objects pointing to library directories
     """
     libraries = []
+    seen = set()
     project_path = Path(project_dir)
     
+    def is_new_library(lib_entry):
+        # Identify directories by (st_dev, st_ino) so the same tree is never scanned twice
+        st = lib_entry.stat()
+        key = (st.st_dev, st.st_ino)
+        if key in seen:
+            print(f"  Skipping duplicate library: {lib_entry.name} at {lib_entry.path}")
+            return False
+        seen.add(key)
+        return True
+    
     # Find PlatformIO libraries in .pio/libdeps/
     pio_libdeps = project_path / ".pio" / "libdeps"
-    if pio_libdeps.exists() and pio_libdeps.is_dir():
+    platform_entries = _list_dir(pio_libdeps)
+    if platform_entries is not None:
         print(f"\nSearching PlatformIO libraries in: {pio_libdeps}")
-        for platform_dir in pio_libdeps.iterdir():
-            if platform_dir.is_dir():
-                for lib_dir in platform_dir.iterdir():
-                    if lib_dir.is_dir():
+        for platform_entry in platform_entries:
+            if not platform_entry.name.startswith(".") and platform_entry.is_dir():
+                for lib_entry in _list_dir(platform_entry.path) or []:
+                    if not lib_entry.name.startswith(".") and lib_entry.is_dir() and is_new_library(lib_entry):
+                        lib_dir = Path(lib_entry.path)
                         libraries.append(lib_dir)
                         print(f"  Found PlatformIO library: {lib_dir.name} at {lib_dir}")
     
     # Find CMake libraries in build/_deps/
     cmake_deps = project_path / "build" / "_deps"
-    if cmake_deps.exists() and cmake_deps.is_dir():
+    lib_entries = _list_dir(cmake_deps)
+    if lib_entries is not None:
         print(f"\nSearching CMake libraries in: {cmake_deps}")
-        for lib_dir in cmake_deps.iterdir():
-            if lib_dir.is_dir() and not lib_dir.name.startswith("."):
+        for lib_entry in lib_entries:
+            if not lib_entry.name.startswith(".") and lib_entry.is_dir():
+                lib_dir = Path(lib_entry.path)
                 # Only include -src directories (source libraries) or directories with include/ folder
                 # Skip -build and -subbuild directories
-                if lib_dir.name.endswith("-src") or (lib_dir / "include").exists():
+                if (lib_dir.name.endswith("-src") or (lib_dir / "include").exists()) and is_new_library(lib_entry):
                     libraries.append(lib_dir)
                     print(f"  Found CMake library: {lib_dir.name} at {lib_dir}")
     
-    return libraries
+    return tuple(libraries)
 
 
 def get_all_files(library_dir):
     """
-    Get all .cpp and .h files in a library directory recursively.
+    Yield all .cpp and .h files in a library directory recursively.
+    
+    PRUNE_DIRS, dot-directories and symlinks are skipped, and file/directory checks use the
+    type cached from the directory read. The root is resolved once, so joined paths are already
+    absolute and need no per-file resolve. A missing library directory yields nothing.
     
     Args:
         library_dir: Path to the library directory
     
     Returns:
-        list: List of Path objects with full absolute paths for .cpp and .h files only
+        generator: Full absolute path strings for .cpp and .h files only
     """
-    files = []
-    if not library_dir.exists() or not library_dir.is_dir():
-        return files
-    
-    try:
-        # Filter for only .cpp and .h files
-        allowed_extensions = {'.h', '.hpp'}
-        for item in library_dir.rglob("*"):
-            if item.is_file() and item.suffix.lower() in allowed_extensions:
-                # Resolve to full absolute path
-                full_path = item.resolve()
-                files.append(full_path)
-    except Exception as e:
-        print(f"  Warning: Error scanning {library_dir}: {e}")
-        import traceback
-        print(f"  Traceback: {traceback.format_exc()}")
-    
-    return files
+    root = os.path.realpath(library_dir)
+    # Depth-first walk with an explicit stack instead of recursion
+    pending = [root]
+    while pending:
+        current_dir = pending.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in PRUNE_DIRS and not entry.name.startswith('.'):
+                            pending.append(entry.path)
+                    # Filter for only .h/.hpp files by name before asking for the file type
+                    elif entry.name.endswith(_SUFFIXES) and entry.is_file(follow_symlinks=False):
+                        yield entry.path
+        except (FileNotFoundError, NotADirectoryError):
+            # Library directory is missing or not a directory
+            continue
+        except OSError as e:
+            print(f"  Warning: Error scanning {current_dir}: {e}")
 
 
 def print_library_files(libraries):
     """
     Print all .cpp and .h files from all libraries.
     
+    Per-library file counts are always printed; the individual paths only when VERBOSE is set.
+    
     Args:
         libraries: List of library directory paths
     
     Returns:
-        list: List of all file paths found (Path objects with full absolute paths)
+        dict: Maps each library directory to its sorted list of file paths (full absolute path strings)
     """
-    all_files = []
-    print("\n" + "=" * 80)
-    print("NAYAN X LIBRARY FILES REPORT (.cpp and .h files only)")
-    print("=" * 80)
+    files_by_library = {}
+    # Collect the report and write it in one go instead of one print per file
+    report = []
+    report.append("\n" + "=" * 80)
+    report.append("NAYAN X LIBRARY FILES REPORT (.cpp and .h files only)")
+    report.append("=" * 80)
     
     if not libraries:
-        print("\nNo libraries found in the project.")
-        return all_files
+        report.append("\nNo libraries found in the project.")
+        sys.stdout.write("\n".join(report) + "\n")
+        return files_by_library
+    
+    # Walk the library trees concurrently (directory reads release the GIL),
+    # then build each library's section in order from the main thread
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(32, len(libraries))) as executor:
+        files_per_library = list(executor.map(lambda lib_dir: list(get_all_files(lib_dir)), libraries))
     
     total_files = 0
-    for lib_dir in libraries:
+    for lib_dir, files in zip(libraries, files_per_library):
         lib_name = lib_dir.name
-        print(f"\n{'=' * 80}")
-        print(f"Library: {lib_name}")
-        print(f"Path: {lib_dir}")
-        print(f"{'=' * 80}")
+        report.append(f"\n{'=' * 80}")
+        report.append(f"Library: {lib_name}")
+        report.append(f"Path: {lib_dir}")
+        report.append(f"{'=' * 80}")
         
-        files = get_all_files(lib_dir)
         total_files += len(files)
-        all_files.extend(files)
+        files_by_library[lib_dir] = files
         
         if files:
-            print(f"\nFound {len(files)} .cpp/.h files:")
-            for file_path in sorted(files):
+            files.sort()
+            if VERBOSE:
+                report.append(f"\nFound {len(files)} .cpp/.h files:")
                 # Print full absolute path (already resolved in get_all_files)
-                print(f"  {file_path}")
+                report.extend(f"  {file_path}" for file_path in files)
+            else:
+                report.append(f"\nFound {len(files)} .cpp/.h files (set ARDUINO_LIB_VERBOSE=1 to list them)")
         else:
-            print("\nNo .cpp/.h files found in this library.")
+            report.append("\nNo .cpp/.h files found in this library.")
     
-    print(f"\n{'=' * 80}")
-    print(f"Total libraries: {len(libraries)}")
-    print(f"Total .cpp/.h files across all libraries: {total_files}")
-    print("=" * 80)
+    report.append(f"\n{'=' * 80}")
+    report.append(f"Total libraries: {len(libraries)}")
+    report.append(f"Total .cpp/.h files across all libraries: {total_files}")
+    report.append("=" * 80)
+    sys.stdout.write("\n".join(report) + "\n")
+    
+    return files_by_library
+
+
+def _scan_cache_dir(project_dir):
+    """
+    Pick the build directory that holds the ServerImpl scan cache for a project.
+    
+    Args:
+        project_dir: Path to the project root directory
     
-    return all_files
+    Returns:
+        str: The project's .pio directory (PlatformIO) or build directory (CMake), or None if neither exists
+    """
+    for name in (".pio", "build"):
+        cache_dir = os.path.join(project_dir, name)
+        if os.path.isdir(cache_dir):
+            return cache_dir
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _import_l3(core_scripts_dir):
+    """
+    Import L3_process_and_register from the core scripts directory, only once.
+    
+    Args:
+        core_scripts_dir: Directory containing the arduinolibserver_core scripts
+    
+    Returns:
+        module: The imported L3_process_and_register module
+    """
+    # Multi-environment builds run the hook repeatedly in one process; add the path only once
+    if core_scripts_dir not in sys.path:
+        sys.path.insert(0, core_scripts_dir)
+    import L3_process_and_register
+    return L3_process_and_register
 
 
 def main():
@@ -263,24 +438,23 @@ def main():
         return
     
     libraries = find_all_libraries(project_dir)
-    print_library_files(libraries)
+    files_by_library = print_library_files(libraries)
     
     # Get current library path and process ServerImpl macros from ALL libraries
     print("\n" + "=" * 80)
     print("Processing ServerImpl macros in all libraries...")
     print("=" * 80)
     
-    current_library_path = get_current_library_path(project_dir)
+    current_library_path = get_current_library_path(project_dir, libraries=libraries)
     if not current_library_path:
         print("Error: Could not determine current library path (arduionolibserver)")
         return
     
     print(f"Current library path (for ServerFactoryInit.h): {current_library_path}")
     
-    # Get all .h/.hpp files from ALL libraries, not just the current one
+    # Get all .h/.hpp files from ALL libraries, not just the current one (already walked for the report)
     all_library_files = []
-    for lib_dir in libraries:
-        lib_files = get_all_files(lib_dir)
+    for lib_dir, lib_files in files_by_library.items():
         all_library_files.extend(lib_files)
         if lib_files:
             print(f"  Found {len(lib_files)} .h/.hpp file(s) in library: {lib_dir.name} at {lib_dir}")
@@ -314,30 +488,42 @@ def main():
         else:
             # Fallback: use current_library_path to find scripts directory
             core_scripts_dir = current_library_path / "arduinolibserver_scripts" / "arduinolibserver_core"
-        sys.path.insert(0, str(core_scripts_dir))
-        
-        from L3_process_and_register import check_and_comment_server_impl, generate_registration_code, generate_include_statements, update_server_factory_init
+        l3 = _import_l3(str(core_scripts_dir))
+        process_files = l3.process_files
+        generate_registration_code = l3.generate_registration_code
+        generate_include_statements = l3.generate_include_statements
+        update_server_factory_init = l3.update_server_factory_init
         
         all_registrations = []
         processed_count = 0
         commented_count = 0
+        report = []
         
-        # Process each file from all libraries
-        for file_path in all_library_files:
-            print(f"\nProcessing: {file_path}")
-            result = check_and_comment_server_impl(file_path)
+        # Process the files from all libraries in parallel, then report in order.
+        # Results for headers unchanged since the last build come from the project's scan cache.
+        cache_dir = _scan_cache_dir(project_dir)
+        cache = {}
+        if cache_dir:
+            wanted = set(all_library_files)
+            # Drop entries for headers that are no longer part of any library
+            cache = {path: entry for path, entry in l3.load_scan_cache(cache_dir).items() if path in wanted}
+        results = process_files(all_library_files, cache)
+        if cache_dir:
+            l3.save_scan_cache(cache_dir, cache)
+        for file_path, result in zip(all_library_files, results):
+            report.append(f"\nProcessing: {file_path}")
             
             if result['error']:
-                print(f"  Error: {result['error']}")
+                report.append(f"  Error: {result['error']}")
                 continue
             
             if result['found']:
                 processed_count += 1
                 if result['modified']:
                     commented_count += 1
-                    print(f"  ✓ Commented out {len(result['matches'])} ServerImpl macro(s)")
+                    report.append(f"  ✓ Commented out {len(result['matches'])} ServerImpl macro(s)")
                 else:
-                    print(f"  ✓ Found {len(result['matches'])} ServerImpl macro(s) (already commented)")
+                    report.append(f"  ✓ Found {len(result['matches'])} ServerImpl macro(s) (already commented)")
                 
                 # Add registrations to the list
                 for match in result['matches']:
@@ -346,16 +532,17 @@ def main():
                         'server_impl_content': match['server_impl_content'],
                         'file_path': match.get('file_path', '')  # Include file path
                     })
-                    print(f"    - Class: {match['class_name']}, ServerImpl: \"{match['server_impl_content']}\"")
+                    report.append(f"    - Class: {match['class_name']}, ServerImpl: \"{match['server_impl_content']}\"")
             else:
-                print(f"  - No ServerImpl macro found")
+                report.append(f"  - No ServerImpl macro found")
         
-        print(f"\n{'=' * 80}")
-        print(f"Summary:")
-        print(f"  Files processed: {processed_count}/{len(all_library_files)}")
-        print(f"  Files with macros commented: {commented_count}")
-        print(f"  Total registrations: {len(all_registrations)}")
-        print(f"{'=' * 80}\n")
+        report.append(f"\n{'=' * 80}")
+        report.append(f"Summary:")
+        report.append(f"  Files processed: {processed_count}/{len(all_library_files)}")
+        report.append(f"  Files with macros commented: {commented_count}")
+        report.append(f"  Total registrations: {len(all_registrations)}")
+        report.append(f"{'=' * 80}\n")
+        sys.stdout.write("\n".join(report) + "\n")
         
         if all_registrations:
             # Generate include statements
@@ -394,10 +581,12 @@ def main():
         print(f"Error processing ServerImpl macros: {e}")
 
 
-# Execute main function
-if __name__ == "__main__":
-    main()
-else:
-    # When imported by PlatformIO, execute immediately
+# Execute main function, both when run directly and when imported by PlatformIO.
+# The flag lives on the module object so a re-import in the same process does not scan again.
+# Process pool workers re-import this script as __mp_main__ and must not run it.
+_module = sys.modules.get(__name__)
+if __name__ != "__mp_main__" and not getattr(_module, "_ALREADY_RAN", False):
+    if _module is not None:
+        _module._ALREADY_RAN = True
     main()
 